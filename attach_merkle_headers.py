@@ -17,14 +17,60 @@ Attaches merkle hash headers to all tracked files for provenance.
 - Text files: Header comment
 
 Run after any significant changes to update headers.
+
+Hashes are cached in .merkle_cache.json keyed by each file's stat signature
+(size, mtime, inode), so unchanged files are skipped on later runs.
+Pass --no-cache to force a full rescan.
+
+Use --jobs N to attach headers with a pool of N worker processes
+(--jobs 0 uses every CPU). Output files and log order match the serial run.
+
+Subdirectories are scanned recursively (except SKIP_DIRS, hidden directories
+and *.egg-info packaging metadata) and the header-free content hashes become
+the leaves of a Merkle tree written to merkle_state.json.
+Only directories on the path from a changed leaf to the root are rehashed.
+
+Large files are hashed without loading them: the header is located in the
+first HEADER_SCAN_BYTES and the rest is fed to SHA-256 from an mmap.
+
+Pass 1 reads each new or modified file once and records its references in a
+dependency index with reverse edges. Headers reference each dependency's
+header-free content hash, which rewriting a header never changes, so only
+changed files and the files that reference them are re-headered, in any
+order, and files that reference each other settle after one run. Use
+--why FILE to see why a file would be re-headered.
+
+Use --check to verify headers without writing anything: stale or missing
+headers are reported and the exit code is 1. A normal run also leaves a file
+untouched when its regenerated header would be identical; the updated date
+only changes when the hash or references do.
+
+Use --watch to keep headers current while you edit. With the optional
+inotify_simple package, events name the changed files and only those are
+rescanned; otherwise the tree is stat-polled. Bursts of saves are debounced,
+and each batch re-headers just the changed files and their dependents.
 ==============================================================================
 """
 
 import os
 import re
+import sys
+import json
+import mmap
+import time
 import hashlib
+import argparse
+import codecs
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Tuple
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    # Optional: watch mode falls back to pure stat polling
+    INotify = None
 
 # Files to process
 TRACKED_EXTENSIONS = {
@@ -39,8 +85,37 @@ SKIP_FILES = [
     'requirements.txt',  # Keep minimal
 ]
 
-# Directories to skip
-SKIP_DIRS = ['__pycache__', '.git', 'oke_state', 'backups']
+# Directories to skip (hidden directories and *.egg-info are always skipped too)
+SKIP_DIRS = ['__pycache__', '.git', 'oke_state', 'backups',
+             '.venv', 'venv', '.tox', '.pytest_cache', '.mypy_cache', 'node_modules',
+             'build', 'dist']
+
+# Persistent hash cache (lives in the root directory being processed)
+CACHE_FILE = '.merkle_cache.json'
+CACHE_VERSION = 3
+
+# Streaming hash settings: headers are located within the first
+# HEADER_SCAN_BYTES of a file
+HEADER_SCAN_BYTES = 8192
+
+# Watch mode timing (seconds)
+WATCH_POLL_INTERVAL = 1.0
+WATCH_DEBOUNCE = 0.5
+
+# Merkle tree state (lives in the root directory being processed)
+STATE_FILE = 'merkle_state.json'
+STATE_VERSION = 1
+
+# Reference patterns used for dependency detection (ASCII-only, so the bytes
+# variants find the same references in undecoded UTF-8)
+IMPORT_PATTERN = re.compile(r'from (oke_\w+|claude_\w+) import|import (oke_\w+|claude_\w+)', re.ASCII)
+DOC_PATTERN = re.compile(r'(docs_\w+\.md|MERKLE_LLM_PROTOCOL\.md|COLLECTIVE_QUERY_FLOW\.md|README\.md)', re.ASCII)
+IMPORT_BYTES_PATTERN = re.compile(IMPORT_PATTERN.pattern.encode('ascii'))
+DOC_BYTES_PATTERN = re.compile(DOC_PATTERN.pattern.encode('ascii'))
+
+# Existing python header block and its reference lines
+PY_HEADER_PATTERN = re.compile(r'# MERKLE =+\n(.*?)# END MERKLE =+\n', re.DOTALL)
+PY_REFERENCE_PATTERN = re.compile(r'#   (\S+) \[(\w+)\]$')
 
 
 def compute_hash(content: bytes) -> str:
@@ -48,15 +123,86 @@ def compute_hash(content: bytes) -> str:
     return hashlib.sha256(content).hexdigest()[:16]
 
 
-def compute_content_hash(filepath: str) -> str:
-    """Compute hash of file content WITHOUT the header."""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
+@contextmanager
+def open_mapped(filepath: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Yield a read-only mmap of the file, or its bytes if it cannot be mapped."""
+    with open(filepath, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and some filesystems cannot be mapped
+            yield f.read()
+            return
+        try:
+            yield data
+        finally:
+            data.close()
+
+
+def hash_without_header(data: Union[mmap.mmap, bytes], filepath: str) -> Optional[str]:
+    """
+    Hash file bytes minus the header, scanning only the head of the file.
     
-    # Strip existing header if present
-    content = strip_existing_header(content, filepath)
+    The header is stripped from the first HEADER_SCAN_BYTES (cut at a line
+    boundary) and the remainder is hashed in place. Returns None whenever the
+    result could differ from stripping the fully decoded text: small files,
+    carriage returns (text mode translates them), header markers beyond the
+    head, or a head that strips down to nothing.
+    """
+    if len(data) <= HEADER_SCAN_BYTES:
+        return None
+    
+    cut = data.rfind(b'\n', 0, HEADER_SCAN_BYTES) + 1
+    if cut == 0:
+        return None
     
-    return compute_hash(content.encode('utf-8'))
+    head_bytes = data[:cut]
+    if b'\r' in head_bytes or data.find(b'\r', cut) != -1:
+        return None
+    
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.md':
+        # The frontmatter must close inside the head
+        if head_bytes.startswith(b'---') and head_bytes.find(b'---', 3) == -1:
+            return None
+    elif ext == '.py':
+        # No MERKLE marker may start on the head's last line or beyond it
+        last_line = head_bytes.rfind(b'\n', 0, cut - 1) + 1
+        if data.find(b'MERKLE', last_line) != -1:
+            return None
+    elif ext == '.txt':
+        # All three header lines must lie inside the head
+        if head_bytes.count(b'\n') < 3:
+            return None
+    
+    try:
+        head = canonical_content(head_bytes.decode('utf-8'), filepath)
+    except UnicodeDecodeError:
+        return None
+    if not head:
+        return None
+    
+    h = hashlib.sha256(head.encode('utf-8'))
+    with memoryview(data) as view:
+        tail = view[cut:]
+        h.update(tail)
+        tail.release()
+    return h.hexdigest()[:16]
+
+
+def decode_text(data: Union[mmap.mmap, bytes]) -> str:
+    """Decode file bytes exactly as text-mode reading would (\r\n and \r become \n)."""
+    text = codecs.decode(data, 'utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def encode_text(text: str) -> bytes:
+    """Encode text exactly as a text-mode write would (\n becomes os.linesep)."""
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    return text.encode('utf-8')
 
 
 def strip_existing_header(content: str, filepath: str) -> str:
@@ -109,39 +255,308 @@ def strip_existing_header(content: str, filepath: str) -> str:
     return content
 
 
-def get_file_dependencies(filepath: str, all_files: Dict[str, str]) -> Dict[str, str]:
-    """Extract file dependencies (imports, references) and their hashes."""
-    deps = {}
-    
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
+def canonical_content(content: str, filepath: str) -> str:
+    """
+    Strip the header the way a rescan of the re-headered file would.
     
+    A file without a header can start with text that stripping a header
+    removes (blank lines, a second shebang), so the content is stripped again
+    under a placeholder header until nothing more comes off. The result is
+    what process_file writes after the header, so its hash is the one every
+    later scan of the file computes.
+    """
+    placeholder = create_header(filepath, '0' * 16, {})
+    content = strip_existing_header(content, filepath)
+    while True:
+        stripped = strip_existing_header(placeholder + content, filepath)
+        if stripped == content:
+            return content
+        content = stripped
+
+
+def scan_references(content: Union[str, mmap.mmap, bytes], filepath: str) -> List[str]:
+    """Extract candidate file references (imports, doc links) from text or raw bytes."""
+    refs = []
     ext = os.path.splitext(filepath)[1].lower()
-    basename = os.path.basename(filepath)
+    
+    binary = not isinstance(content, str)
+    import_pattern = IMPORT_BYTES_PATTERN if binary else IMPORT_PATTERN
+    doc_pattern = DOC_BYTES_PATTERN if binary else DOC_PATTERN
     
     if ext == '.py':
         # Find imports
-        import_pattern = r'from (oke_\w+|claude_\w+) import|import (oke_\w+|claude_\w+)'
-        for match in re.finditer(import_pattern, content):
+        for match in import_pattern.finditer(content):
             module = match.group(1) or match.group(2)
-            module_file = module + '.py'
-            if module_file in all_files and module_file != basename:
-                deps[module_file] = all_files[module_file]
+            refs.append(module + (b'.py' if binary else '.py'))
     
     # Find doc references in any file type
-    doc_pattern = r'(docs_\w+\.md|MERKLE_LLM_PROTOCOL\.md|COLLECTIVE_QUERY_FLOW\.md|README\.md)'
-    for match in re.finditer(doc_pattern, content):
-        doc_file = match.group(1)
-        if doc_file in all_files and doc_file != basename:
-            deps[doc_file] = all_files[doc_file]
+    for match in doc_pattern.finditer(content):
+        refs.append(match.group(1))
     
+    # Deduplicate, keeping first-seen order
+    refs = list(dict.fromkeys(refs))
+    return [ref.decode('ascii') for ref in refs] if binary else refs
+
+
+def resolve_reference(ref: str, rel_dir: str, all_files: Mapping[str, str]) -> Optional[str]:
+    """Resolve a referenced file name, preferring a sibling over a top-level file."""
+    if rel_dir:
+        sibling = f'{rel_dir}/{ref}'
+        if sibling in all_files:
+            return sibling
+    if ref in all_files:
+        return ref
+    return None
+
+
+def resolve_dependencies(filepath: str, refs: List[str], all_files: Mapping[str, str],
+                         key: Optional[str] = None) -> Dict[str, str]:
+    """Map candidate references to the tracked files (and hashes) they name."""
+    key = key or os.path.basename(filepath)
+    rel_dir = os.path.dirname(key)
+    
+    deps = {}
+    for ref in refs:
+        dep = resolve_reference(ref, rel_dir, all_files)
+        if dep is not None and dep != key:
+            deps[dep] = all_files[dep]
     return deps
 
 
-def create_markdown_header(filepath: str, file_hash: str, deps: Dict[str, str]) -> str:
+# ============================================================================
+# HASH CACHE
+# ============================================================================
+
+def stat_signature(filepath: str) -> Tuple[int, int, int]:
+    """Return the (size, mtime_ns, inode) signature used for cache validation."""
+    st = os.stat(filepath)
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+class HashCache:
+    """
+    Persistent per-file cache of hashes and dependencies.
+    
+    Each entry is keyed by relative path and stores the stat signature seen when
+    the entry was recorded, the raw file hash, the header-free content hash,
+    the candidate references found in the file and the dependency hashes that
+    were written into its header. An entry is only trusted while the file's
+    stat signature is unchanged.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    @classmethod
+    def load(cls, path: str) -> 'HashCache':
+        """Load a cache file, starting empty if it is missing or unreadable."""
+        cache = cls(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cache
+        
+        if isinstance(data, dict) and data.get('version') == CACHE_VERSION:
+            cache.entries = data.get('files', {})
+        return cache
+    
+    def save(self, keep: Optional[List[str]] = None):
+        """Write the cache atomically, dropping entries for files not in keep."""
+        if not self.path:
+            return
+        
+        if keep is not None:
+            self.prune(keep)
+        
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'files': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+    
+    def prune(self, keep: Iterable[str]):
+        """Drop entries for files not in keep."""
+        keep_set = set(keep)
+        self.entries = {k: v for k, v in self.entries.items() if k in keep_set}
+    
+    def lookup(self, key: str, filepath: str) -> Optional[dict]:
+        """Return the entry for key if the file's stat signature still matches."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        
+        try:
+            signature = stat_signature(filepath)
+        except OSError:
+            return None
+        
+        if signature != (entry['size'], entry['mtime_ns'], entry['inode']):
+            return None
+        return entry
+    
+    def record(self, key: str, filepath: str, **fields) -> dict:
+        """Store fields for key together with the file's current stat signature."""
+        size, mtime_ns, inode = stat_signature(filepath)
+        entry = {'size': size, 'mtime_ns': mtime_ns, 'inode': inode}
+        entry.update(fields)
+        self.entries[key] = entry
+        return entry
+
+
+# ============================================================================
+# DEPENDENCY INDEX
+# ============================================================================
+
+def scan_file(filepath: str) -> dict:
+    """
+    Read a file once for its raw hash, header-free content hash and references.
+    
+    Everything runs over the mapped bytes; the file is only decoded when its
+    content hash cannot be computed in place (see hash_without_header).
+    """
+    with open_mapped(filepath) as data:
+        raw_hash = compute_hash(data)
+        file_hash = hash_without_header(data, filepath)
+        if file_hash is not None:
+            refs = scan_references(data, filepath)
+        else:
+            text = decode_text(data)
+            file_hash = compute_hash(canonical_content(text, filepath).encode('utf-8'))
+            refs = scan_references(text, filepath)
+    
+    return {'raw_hash': raw_hash, 'hash': file_hash, 'refs': refs}
+
+
+def scan_files(all_files: Dict[str, str], cache: HashCache,
+               suspects: Optional[Iterable[str]] = None) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    """
+    Scan every file, reusing cache entries whose stat signature still matches.
+    
+    Returns (scans, changed) where changed maps each new or modified file to
+    the reason it changed. Files that were only touched get their cache entry
+    refreshed instead. When suspects is given (watch mode, where inotify
+    reports what changed), cached files outside it are trusted without a stat.
+    """
+    scans = {}
+    changed = {}
+    suspects = set(suspects) if suspects is not None else None
+    
+    for key, filepath in sorted(all_files.items()):
+        if suspects is not None and key not in suspects and key in cache.entries:
+            scans[key] = cache.entries[key]
+            continue
+        
+        entry = cache.lookup(key, filepath)
+        if entry is not None:
+            cache.hits += 1
+            scans[key] = entry
+            continue
+        
+        cache.misses += 1
+        scan = scan_file(filepath)
+        scans[key] = scan
+        
+        previous = cache.entries.get(key)
+        if previous is None:
+            changed[key] = "new"
+        elif previous['raw_hash'] != scan['raw_hash']:
+            changed[key] = "modified"
+        else:
+            # Same bytes, new stat signature: refresh the entry
+            cache.record(key, filepath, **{**previous, **scan})
+    
+    return scans, changed
+
+
+class DependencyIndex:
+    """
+    Forward and reverse dependency edges between tracked files.
+    
+    Built from the references found by scan_file, so it costs no extra reads;
+    the references persist in the hash cache between runs.
+    
+    Headers list the header-free content hash of each dependency, and
+    re-headering a file leaves its content hash unchanged. A change therefore
+    invalidates the changed files and their direct dependents only, and
+    those can be re-headered in any order (even around a reference cycle).
+    """
+    
+    def __init__(self):
+        self.forward: Dict[str, List[str]] = {}
+        self.reverse: Dict[str, List[str]] = {}
+    
+    @classmethod
+    def build(cls, refs: Dict[str, List[str]]) -> 'DependencyIndex':
+        """Resolve each file's references against the set of tracked files."""
+        index = cls()
+        for key in sorted(refs):
+            rel_dir = os.path.dirname(key)
+            deps = []
+            for ref in refs[key]:
+                dep = resolve_reference(ref, rel_dir, refs)
+                if dep is not None and dep != key and dep not in deps:
+                    deps.append(dep)
+            index.forward[key] = deps
+            for dep in deps:
+                index.reverse.setdefault(dep, []).append(key)
+        return index
+    
+    def invalidate(self, changed: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Find every file whose header the changed files make stale.
+        
+        Returns a map from each affected file to the dependency it was
+        invalidated through (None for the changed files themselves).
+        """
+        via: Dict[str, Optional[str]] = {key: None for key in sorted(changed)}
+        for key in sorted(changed):
+            for dependent in self.reverse.get(key, ()):
+                via.setdefault(dependent, key)
+        return via
+    
+    def chain(self, key: str, via: Dict[str, Optional[str]]) -> List[str]:
+        """Follow via from key back to the changed file that invalidated it."""
+        chain = [key]
+        while via.get(chain[-1]) is not None and via[chain[-1]] not in chain:
+            chain.append(via[chain[-1]])
+        return chain
+
+
+def plan_updates(all_files: Dict[str, str], cache: HashCache,
+                 suspects: Optional[Iterable[str]] = None) -> Tuple[Dict[str, dict], DependencyIndex, Dict[str, str]]:
+    """
+    Scan files and decide which headers are out of date.
+    
+    Returns (scans, index, changed): a file is changed when it is new or
+    modified, or when the dependency hashes in its header no longer match
+    for some other reason (a referenced file appeared or disappeared, or a
+    previous run was interrupted). Pass the changed keys to
+    DependencyIndex.invalidate for the full set. suspects is passed on to
+    scan_files.
+    """
+    scans, changed = scan_files(all_files, cache, suspects)
+    index = DependencyIndex.build({key: scan['refs'] for key, scan in scans.items()})
+    
+    # Dependents of changed files are reached through the index; check the rest
+    reached = index.invalidate(changed)
+    for key in sorted(all_files):
+        if key in reached:
+            continue
+        deps = {dep: scans[dep]['hash'] for dep in index.forward[key]}
+        if deps != cache.entries[key].get('deps'):
+            changed[key] = "dependencies changed"
+    
+    return scans, index, changed
+
+
+def create_markdown_header(filepath: str, file_hash: str, deps: Dict[str, str],
+                           updated: Optional[str] = None) -> str:
     """Create YAML frontmatter for markdown files."""
     basename = os.path.basename(filepath)
-    now = datetime.now().isoformat()
+    now = updated or datetime.now().isoformat()
     
     lines = [
         '---',
@@ -162,10 +577,11 @@ def create_markdown_header(filepath: str, file_hash: str, deps: Dict[str, str])
     return '\n'.join(lines)
 
 
-def create_python_header(filepath: str, file_hash: str, deps: Dict[str, str]) -> str:
+def create_python_header(filepath: str, file_hash: str, deps: Dict[str, str],
+                         updated: Optional[str] = None) -> str:
     """Create header comment block for Python files."""
     basename = os.path.basename(filepath)
-    now = datetime.now().isoformat()
+    now = updated or datetime.now().isoformat()
     
     lines = [
         '#!/usr/bin/env python3',
@@ -188,10 +604,10 @@ def create_python_header(filepath: str, file_hash: str, deps: Dict[str, str]) ->
     return '\n'.join(lines)
 
 
-def create_text_header(filepath: str, file_hash: str) -> str:
+def create_text_header(filepath: str, file_hash: str, updated: Optional[str] = None) -> str:
     """Create header comment for text files."""
     basename = os.path.basename(filepath)
-    now = datetime.now().isoformat()
+    now = updated or datetime.now().isoformat()
     
     lines = [
         f'# MERKLE: {file_hash}',
@@ -203,10 +619,109 @@ def create_text_header(filepath: str, file_hash: str) -> str:
     return '\n'.join(lines)
 
 
-def process_file(filepath: str, all_hashes: Dict[str, str]) -> Tuple[bool, str]:
+def create_header(filepath: str, file_hash: str, deps: Dict[str, str],
+                  updated: Optional[str] = None) -> str:
+    """Create the header for the file's type (text headers list no references)."""
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.md':
+        return create_markdown_header(filepath, file_hash, deps, updated)
+    if ext == '.py':
+        return create_python_header(filepath, file_hash, deps, updated)
+    return create_text_header(filepath, file_hash, updated)
+
+
+def parse_existing_header(content: str, filepath: str) -> Optional[dict]:
+    """
+    Parse the merkle header at the start of content.
+    
+    Returns {'hash', 'updated', 'references'} where references maps each
+    listed file to its recorded hash, or None if there is no merkle header.
+    Text headers carry no references.
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    header = {'hash': None, 'updated': None, 'references': {}}
+    
+    if ext == '.md':
+        if not content.startswith('---'):
+            return None
+        end = content.find('---', 3)
+        if end == -1:
+            return None
+        
+        current = None
+        for line in content[3:end].split('\n'):
+            if line.startswith('merkle:'):
+                header['hash'] = line[len('merkle:'):].strip()
+            elif line.startswith('updated:'):
+                header['updated'] = line[len('updated:'):].strip()
+            elif line.startswith('  - file:'):
+                current = line[len('  - file:'):].strip()
+                header['references'][current] = None
+            elif line.startswith('    hash:') and current is not None:
+                header['references'][current] = line[len('    hash:'):].strip()
+    
+    elif ext == '.py':
+        match = PY_HEADER_PATTERN.search(content)
+        if match is None:
+            return None
+        
+        for line in match.group(1).split('\n'):
+            if line.startswith('# hash:'):
+                header['hash'] = line[len('# hash:'):].strip()
+            elif line.startswith('# updated:'):
+                header['updated'] = line[len('# updated:'):].strip()
+            else:
+                ref = PY_REFERENCE_PATTERN.match(line)
+                if ref:
+                    header['references'][ref.group(1)] = ref.group(2)
+    
+    elif ext == '.txt':
+        lines = content.split('\n', 3)
+        if (len(lines) >= 3 and lines[0].startswith('# MERKLE:') and
+                lines[1].startswith('# FILE:') and lines[2].startswith('# UPDATED:')):
+            header['hash'] = lines[0][len('# MERKLE:'):].strip()
+            header['updated'] = lines[2][len('# UPDATED:'):].strip()
+    
+    if not header['hash']:
+        return None
+    return header
+
+
+def read_existing_header(filepath: str) -> Optional[dict]:
+    """Read and parse a file's merkle header, reading past the head only if the header continues."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read(HEADER_SCAN_BYTES)
+        header = parse_existing_header(content, filepath)
+        if header is None and len(content) == HEADER_SCAN_BYTES:
+            ext = os.path.splitext(filepath)[1].lower()
+            if (ext == '.md' and content.startswith('---')) or (ext == '.py' and 'MERKLE' in content):
+                header = parse_existing_header(content + f.read(), filepath)
+    return header
+
+
+def header_problem(header: Optional[dict], filepath: str, file_hash: str, deps: Dict[str, str]) -> Optional[str]:
+    """Describe how an existing header differs from the expected hash and references."""
+    if header is None:
+        return "missing header"
+    if header['hash'] != file_hash:
+        return f"stale hash ({header['hash']} != {file_hash})"
+    
+    # Text headers do not list references
+    if os.path.splitext(filepath)[1].lower() == '.txt':
+        return None
+    if header['references'] != deps:
+        stale = sorted(set(header['references']) ^ set(deps) |
+                       {dep for dep in deps if header['references'].get(dep) != deps[dep]})
+        return f"stale references ({', '.join(stale)})"
+    return None
+
+
+def process_file(filepath: str, all_hashes: Mapping[str, str],
+                 cache: Optional[HashCache] = None, key: Optional[str] = None) -> Tuple[bool, str]:
     """Process a single file, add/update merkle header."""
     ext = os.path.splitext(filepath)[1].lower()
     basename = os.path.basename(filepath)
+    key = key or basename
     
     if ext not in TRACKED_EXTENSIONS:
         return False, "skipped (extension)"
@@ -214,108 +729,697 @@ def process_file(filepath: str, all_hashes: Dict[str, str]) -> Tuple[bool, str]:
     if basename in SKIP_FILES:
         return False, "skipped (excluded)"
     
-    # Read current content
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
+    # Skip files whose content and dependency hashes are unchanged
+    if cache is not None:
+        entry = cache.lookup(key, filepath)
+        if entry is not None and resolve_dependencies(filepath, entry['refs'], all_hashes, key) == entry.get('deps'):
+            return False, "unchanged (cached)"
     
-    # Strip existing header
-    clean_content = strip_existing_header(content, filepath)
+    # Read current content (once: the raw hash comes from the same bytes)
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    content = decode_text(data)
+    
+    # Strip existing header (as a rescan of the re-headered file would)
+    clean_content = canonical_content(content, filepath)
     
     # Compute hash of clean content
     file_hash = compute_hash(clean_content.encode('utf-8'))
     
     # Get dependencies
-    deps = get_file_dependencies(filepath, all_hashes)
+    refs = scan_references(content, filepath)
+    deps = resolve_dependencies(filepath, refs, all_hashes, key)
     
-    # Create new header
-    if ext == '.md':
-        header = create_markdown_header(filepath, file_hash, deps)
-    elif ext == '.py':
-        header = create_python_header(filepath, file_hash, deps)
-    elif ext == '.txt':
-        header = create_text_header(filepath, file_hash)
-    else:
-        return False, "unknown type"
+    # Keep the existing date when the hash and references are unchanged
+    existing = parse_existing_header(content, filepath)
+    updated = existing['updated'] if existing and header_problem(existing, filepath, file_hash, deps) is None else None
+    
+    # Combine new header with clean content
+    new_content = create_header(filepath, file_hash, deps, updated) + clean_content
     
-    # Combine header with clean content
-    new_content = header + clean_content
+    # Write back, unless the file already has exactly this header
+    written = new_content != content
+    if written:
+        data = encode_text(new_content)
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        # The new header is part of the file now; record what a rescan would find
+        refs = scan_references(new_content, filepath)
     
-    # Write back
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    # Remember what is on disk so the next run can skip this file
+    if cache is not None:
+        raw_hash = compute_hash(data)
+        cache.record(key, filepath, raw_hash=raw_hash, hash=file_hash, refs=refs, deps=deps)
     
+    if not written:
+        return False, "unchanged (header current)"
     return True, file_hash
 
 
-def collect_all_files(root_dir: str) -> Dict[str, str]:
-    """Collect all trackable files and their paths."""
-    files = {}
+# ============================================================================
+# PARALLEL PROCESSING
+# ============================================================================
+
+# Dependency hashes shared with pool workers (set once per worker process)
+_worker_hashes: Dict[str, str] = {}
+
+
+def _init_worker(all_hashes: Dict[str, str]):
+    """Pool initializer: install the pass 1 hashes in the worker process."""
+    global _worker_hashes
+    _worker_hashes = all_hashes
+
+
+def _process_task(task: Tuple[str, str, Optional[dict], bool]) -> Tuple[bool, str, float, Optional[dict]]:
+    """Run process_file in a worker and hand back timing and cache changes."""
+    key, filepath, entry, use_cache = task
+    
+    # Each worker gets a private one-entry cache; the parent merges it back
+    cache = None
+    if use_cache:
+        cache = HashCache()
+        if entry is not None:
+            cache.entries[key] = entry
+    
+    start = time.perf_counter()
+    success, result = process_file(filepath, _worker_hashes, cache, key)
+    elapsed = time.perf_counter() - start
+    
+    return success, result, elapsed, cache.entries.get(key) if cache is not None else None
+
+
+def _timed_process(filepath: str, all_hashes: Mapping[str, str], cache: Optional[HashCache],
+                   key: str) -> Tuple[bool, str, float]:
+    """Run process_file in this process, returning (success, result, seconds)."""
+    start = time.perf_counter()
+    success, result = process_file(filepath, all_hashes, cache, key)
+    return success, result, time.perf_counter() - start
+
+
+def _map_pool(pool: ProcessPoolExecutor, tasks: List[tuple], cache: Optional[HashCache],
+              chunksize: int) -> Iterator[Tuple[bool, str, float]]:
+    """Run tasks on the pool, merging cache entries back in task order."""
+    # pool.map yields in submission order, so logs match the serial path
+    for task, (success, result, elapsed, entry) in zip(tasks, pool.map(_process_task, tasks, chunksize=chunksize)):
+        if cache is not None and entry is not None:
+            cache.entries[task[0]] = entry
+        yield success, result, elapsed
+
+
+def iter_process_results(all_files: Dict[str, str], all_hashes: Dict[str, str],
+                         cache: Optional[HashCache] = None,
+                         jobs: int = 1) -> Iterator[Tuple[str, bool, str, float]]:
+    """
+    Process files in sorted order, yielding (key, success, result, seconds).
+    
+    all_hashes holds the header-free content hashes from pass 1, which no
+    header write changes, so every file can be processed independently.
+    Serial and pool runs yield the same sequence and write the same files.
+    """
+    keys = sorted(all_files)
+    
+    if jobs <= 1 or len(keys) <= 1:
+        for key in keys:
+            yield (key,) + _timed_process(all_files[key], all_hashes, cache, key)
+        return
     
-    for entry in os.listdir(root_dir):
-        if entry in SKIP_DIRS:
+    tasks = [(key, all_files[key], cache.entries.get(key) if cache is not None else None, cache is not None)
+             for key in keys]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(all_hashes,)) as pool:
+        outcomes = _map_pool(pool, tasks, cache, max(1, len(tasks) // (jobs * 8)))
+        for key, outcome in zip(keys, outcomes):
+            yield (key,) + outcome
+
+
+# ============================================================================
+# MERKLE TREE
+# ============================================================================
+
+def compute_node_hash(children: Dict[str, str]) -> str:
+    """Hash a directory node from its children's names and hashes."""
+    h = hashlib.sha256()
+    for name in sorted(children):
+        h.update(f'{name}:{children[name]}\n'.encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def load_merkle_state(path: str) -> Optional[dict]:
+    """Load a previously written merkle state, or None if unusable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    if not isinstance(state, dict) or state.get('version') != STATE_VERSION:
+        return None
+    return state
+
+
+def build_merkle_tree(leaves: Dict[str, str], previous: Optional[dict] = None) -> Tuple[dict, int]:
+    """
+    Build the Merkle tree over leaf hashes keyed by relative path.
+    
+    Directory hashes from the previous state are reused unless a leaf below
+    them was added, removed or changed, so only the paths from changed
+    leaves up to the root are rehashed. Returns (state, dirs rehashed).
+    """
+    prev_leaves = previous.get('leaves', {}) if previous else {}
+    prev_dirs = previous.get('dirs', {}) if previous else {}
+    
+    # Children of every directory: leaf files and subdirectories
+    all_dirs = {''}
+    leaf_children: Dict[str, Dict[str, str]] = {}
+    sub_children: Dict[str, List[str]] = {}
+    for key, leaf_hash in leaves.items():
+        parent, name = os.path.split(key)
+        leaf_children.setdefault(parent, {})[name] = leaf_hash
+        # Register each new ancestor directory with its own parent
+        while parent not in all_dirs:
+            all_dirs.add(parent)
+            grandparent = os.path.dirname(parent)
+            sub_children.setdefault(grandparent, []).append(parent)
+            parent = grandparent
+    
+    # Directories touched by an added, removed or changed leaf
+    dirty = set()
+    for key in set(leaves) | set(prev_leaves):
+        if leaves.get(key) == prev_leaves.get(key):
+            continue
+        parent = os.path.dirname(key)
+        while parent not in dirty:
+            dirty.add(parent)
+            if not parent:
+                break
+            parent = os.path.dirname(parent)
+    
+    # Rehash dirty (or previously unknown) directories, deepest first
+    dirs = {}
+    rehashed = 0
+    for rel_dir in sorted(all_dirs, key=lambda d: d.count('/') + bool(d), reverse=True):
+        if rel_dir not in dirty and rel_dir in prev_dirs:
+            dirs[rel_dir] = prev_dirs[rel_dir]
             continue
+        children = dict(leaf_children.get(rel_dir, {}))
+        for sub in sub_children.get(rel_dir, []):
+            children[os.path.basename(sub) + '/'] = dirs[sub]
+        dirs[rel_dir] = compute_node_hash(children)
+        rehashed += 1
+    
+    state = {
+        'version': STATE_VERSION,
+        'root': dirs[''],
+        'dirs': dirs,
+        'leaves': dict(sorted(leaves.items())),
+    }
+    return state, rehashed
+
+
+def save_merkle_state(path: str, state: dict):
+    """Write the merkle state atomically."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_skipped_dir(name: str) -> bool:
+    """True for directories the tree walk must not descend into."""
+    return name in SKIP_DIRS or name.startswith('.') or name.endswith('.egg-info')
+
+
+def is_tracked_file(name: str) -> bool:
+    """True for file names the tool attaches headers to."""
+    return os.path.splitext(name)[1].lower() in TRACKED_EXTENSIONS and name not in SKIP_FILES
+
+
+def join_key(rel_dir: str, name: str) -> str:
+    """Build the '/'-separated relative key of name inside rel_dir."""
+    return f'{rel_dir}/{name}' if rel_dir else name
+
+
+def walk_tracked(root_dir: str, rel_start: str = '') -> Iterator[Tuple[str, str, List[str]]]:
+    """
+    Walk root_dir (or its subdirectory rel_start), skipping skipped directories.
+    
+    Yields (dirpath, rel_dir, tracked file names) for every directory, where
+    rel_dir is the '/'-separated path relative to root_dir.
+    """
+    start = os.path.join(root_dir, *rel_start.split('/')) if rel_start else root_dir
+    for dirpath, dirnames, filenames in os.walk(start):
+        # Prune skipped directories in place so os.walk does not descend
+        dirnames[:] = sorted(d for d in dirnames if not is_skipped_dir(d))
         
-        filepath = os.path.join(root_dir, entry)
+        rel_dir = os.path.relpath(dirpath, root_dir)
+        rel_dir = '' if rel_dir == '.' else rel_dir.replace(os.sep, '/')
         
-        if os.path.isfile(filepath):
-            ext = os.path.splitext(entry)[1].lower()
-            if ext in TRACKED_EXTENSIONS and entry not in SKIP_FILES:
-                files[entry] = filepath
+        yield dirpath, rel_dir, sorted(name for name in filenames if is_tracked_file(name))
+
+
+def collect_all_files(root_dir: str) -> Dict[str, str]:
+    """Collect all trackable files, keyed by '/'-separated path relative to root_dir."""
+    files = {}
+    
+    for dirpath, rel_dir, names in walk_tracked(root_dir):
+        for name in names:
+            files[join_key(rel_dir, name)] = os.path.join(dirpath, name)
     
     return files
 
 
+def update_merkle_state(root_dir: str, scans: Dict[str, dict]) -> Tuple[dict, int]:
+    """Rebuild the merkle tree from scanned content hashes, writing the state only if it changed."""
+    state_path = os.path.join(root_dir, STATE_FILE)
+    previous = load_merkle_state(state_path)
+    state, rehashed = build_merkle_tree({key: scan['hash'] for key, scan in scans.items()}, previous)
+    
+    if state != previous:
+        save_merkle_state(state_path, state)
+    return state, rehashed
+
+
+def check_headers(all_files: Dict[str, str], scans: Dict[str, dict],
+                  index: DependencyIndex) -> Dict[str, str]:
+    """
+    Find missing or stale headers without writing anything.
+    
+    Content hashes may come from the cache, but every file's header is read
+    and compared (only its head, see read_existing_header), so the verdict
+    never depends on the cache. Returns {key: problem}.
+    """
+    problems = {}
+    for key in sorted(all_files):
+        filepath = all_files[key]
+        deps = {dep: scans[dep]['hash'] for dep in index.forward[key]}
+        problem = header_problem(read_existing_header(filepath), filepath, scans[key]['hash'], deps)
+        if problem is not None:
+            problems[key] = problem
+    return problems
+
+
+def print_why(key: str, index: DependencyIndex, via: Dict[str, Optional[str]], changed: Dict[str, str]):
+    """Print the invalidation chain that makes key's header stale."""
+    print(f"  Why: {key}")
+    if key not in via:
+        print("    up to date")
+        return
+    
+    chain = index.chain(key, via)
+    print(f"    {chain[0]}")
+    for dep in chain[1:]:
+        print(f"      <- depends on {dep}")
+    print(f"    {chain[-1]}: {changed[chain[-1]]}")
+
+
+# ============================================================================
+# WATCH MODE
+# ============================================================================
+
+def snapshot_signatures(all_files: Dict[str, str]) -> Dict[str, Tuple[int, int, int]]:
+    """Stat every file; files that vanish mid-scan are left out."""
+    signatures = {}
+    for key, filepath in all_files.items():
+        try:
+            signatures[key] = stat_signature(filepath)
+        except OSError:
+            pass
+    return signatures
+
+
+def pending_changes(signatures: Dict[str, Tuple[int, int, int]], cache: HashCache) -> List[str]:
+    """List files added, removed or modified since the cache last saw them."""
+    pending = [key for key in set(signatures) | set(cache.entries)
+               if key not in signatures or key not in cache.entries or
+               signatures[key] != (cache.entries[key]['size'], cache.entries[key]['mtime_ns'],
+                                   cache.entries[key]['inode'])]
+    return sorted(pending)
+
+
+class InotifyWatcher:
+    """
+    Recursive inotify watch that keeps the map of tracked files current.
+    
+    The tree is walked once at startup. After that only directories reported
+    by CREATE|ISDIR or MOVED_TO|ISDIR events are walked and watched, so
+    waiting for changes costs no tree walks and no stats.
+    """
+    
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.notifier = INotify()
+        self.mask = (inotify_flags.CLOSE_WRITE | inotify_flags.CREATE | inotify_flags.DELETE |
+                     inotify_flags.MOVED_FROM | inotify_flags.MOVED_TO)
+        self.dirs: Dict[int, str] = {}
+        self.files: Dict[str, str] = {}
+        self.add_tree('')
+    
+    def add_tree(self, rel_start: str) -> List[str]:
+        """Watch rel_start and its subdirectories; return the tracked files found there."""
+        found = []
+        for dirpath, rel_dir, names in walk_tracked(self.root_dir, rel_start):
+            try:
+                self.dirs[self.notifier.add_watch(dirpath, self.mask)] = rel_dir
+            except OSError:
+                continue
+            for name in names:
+                key = join_key(rel_dir, name)
+                self.files[key] = os.path.join(dirpath, name)
+                found.append(key)
+        return found
+    
+    def drop_tree(self, rel_start: str) -> List[str]:
+        """Stop watching rel_start and everything below it; return the tracked files dropped."""
+        prefix = rel_start + '/' if rel_start else ''
+        for wd, rel_dir in list(self.dirs.items()):
+            if rel_dir == rel_start or rel_dir.startswith(prefix):
+                del self.dirs[wd]
+                try:
+                    self.notifier.rm_watch(wd)
+                except OSError:
+                    # Already gone (the kernel drops watches on deleted directories)
+                    pass
+        
+        dropped = [key for key in self.files if key.startswith(prefix)]
+        for key in dropped:
+            del self.files[key]
+        return dropped
+    
+    def read(self, timeout: float) -> Optional[List[str]]:
+        """
+        Wait up to timeout seconds for events and apply them to files.
+        
+        Returns the tracked files that were written, created or removed, or
+        None if the event queue overflowed and the tree had to be rewalked.
+        """
+        touched = []
+        for event in self.notifier.read(timeout=int(timeout * 1000)):
+            if event.mask & inotify_flags.Q_OVERFLOW:
+                self.drop_tree('')
+                self.add_tree('')
+                return None
+            
+            rel_dir = self.dirs.get(event.wd)
+            if rel_dir is None or not event.name:
+                continue
+            key = join_key(rel_dir, event.name)
+            
+            if event.mask & inotify_flags.ISDIR:
+                if is_skipped_dir(event.name):
+                    continue
+                if event.mask & (inotify_flags.CREATE | inotify_flags.MOVED_TO):
+                    touched.extend(self.add_tree(key))
+                else:
+                    touched.extend(self.drop_tree(key))
+            elif is_tracked_file(event.name):
+                touched.append(key)
+                filepath = os.path.join(self.root_dir, *key.split('/'))
+                if os.path.isfile(filepath):
+                    self.files[key] = filepath
+                else:
+                    self.files.pop(key, None)
+        return touched
+    
+    def close(self):
+        """Release the inotify file descriptor."""
+        self.notifier.close()
+
+
+def find_unreadable(all_files: Dict[str, str], keys: Iterable[str]) -> Dict[str, Exception]:
+    """Read and decode each of keys, returning the files that fail and their errors."""
+    failures = {}
+    for key in sorted(set(keys)):
+        if key not in all_files:
+            continue
+        try:
+            with open(all_files[key], 'rb') as f:
+                decode_text(f.read())
+        except (OSError, UnicodeDecodeError) as error:
+            failures[key] = error
+    return failures
+
+
+def watch_batch(root_dir: str, all_files: Dict[str, str], cache: HashCache, jobs: int, persist: bool,
+                suspects: Optional[Iterable[str]], failed: Mapping[str, Tuple[int, int, int]]) -> Optional[str]:
+    """
+    Re-header what changed since the last batch and return a summary line.
+    
+    Files in failed (unreadable when last tried) keep their cache entry and
+    are neither rescanned nor re-headered. Returns None if nothing changed.
+    """
+    suspects = [key for key in (all_files if suspects is None else suspects) if key not in failed]
+    batch_files = {key: path for key, path in all_files.items() if key not in failed or key in cache.entries}
+    
+    batch_start = time.perf_counter()
+    scans, index, changed = plan_updates(batch_files, cache, suspects)
+    changed = {key: reason for key, reason in changed.items() if key not in failed}
+    removed = len(set(cache.entries) - set(all_files))
+    if not changed and not removed:
+        # Only the tool's own writes (or touches without edits)
+        return None
+    
+    via = index.invalidate(changed)
+    all_hashes = {key: scan['hash'] for key, scan in scans.items()}
+    
+    updated = 0
+    dirty = {key: all_files[key] for key in via if key not in failed}
+    for key, success, result, _ in iter_process_results(dirty, all_hashes, cache, jobs):
+        if success:
+            print(f"    [OK] {key} -> {result}")
+            updated += 1
+    
+    state, _ = update_merkle_state(root_dir, scans)
+    cache.prune(all_files)
+    if persist:
+        cache.save()
+    
+    stamp = datetime.now().strftime('%H:%M:%S')
+    return (f"  [{stamp}] {len(changed)} changed, {removed} removed, {updated} updated, "
+            f"root {state['root']} ({time.perf_counter() - batch_start:.3f}s)")
+
+
+def watch(root_dir: str, cache: HashCache, jobs: int = 1, persist: bool = True,
+          poll_interval: float = WATCH_POLL_INTERVAL, debounce: float = WATCH_DEBOUNCE):
+    """
+    Keep headers current until interrupted.
+    
+    With inotify, events name the files that changed, so a batch stats and
+    rescans only those. Without it, every poll walks the tree and compares
+    each file's stat signature with the cache. Every file the tool writes is
+    recorded in the cache with its new signature, so the tool's own writes
+    never look like changes.
+    
+    A file that cannot be read or decoded is reported and left out of later
+    batches (its cache entry untouched) until it changes again; a file that
+    vanishes mid-batch is treated as removed. Either way the batch is retried
+    without it and watching continues.
+    """
+    watcher = InotifyWatcher(root_dir) if INotify is not None else None
+    mode = "inotify" if watcher is not None else "stat polling"
+    print(f"  Watching {root_dir} ({mode}, Ctrl+C to stop)...")
+    
+    # Unreadable files and their stat signature when they failed
+    failed: Dict[str, Tuple[int, int, int]] = {}
+    
+    # Saves between the initial pass and the watches being added raised no
+    # event, so the first batch checks every file against the cache
+    startup = watcher is not None
+    
+    try:
+        while True:
+            if startup:
+                startup = False
+                all_files = watcher.files
+                suspects = None
+            elif watcher is not None:
+                suspects = watcher.read(poll_interval)
+                if suspects is not None and not suspects:
+                    continue
+                
+                # Debounce: keep collecting events until a burst of saves has settled
+                while True:
+                    more = watcher.read(debounce)
+                    if more is None:
+                        suspects = None
+                    elif not more:
+                        break
+                    elif suspects is not None:
+                        suspects.extend(more)
+                
+                # suspects is None after an overflow: plan_updates then stats every file
+                all_files = watcher.files
+            else:
+                time.sleep(poll_interval)
+                signatures = snapshot_signatures(collect_all_files(root_dir))
+                if not pending_changes(signatures, cache):
+                    continue
+                
+                # Debounce: wait until a burst of saves has settled
+                while True:
+                    time.sleep(debounce)
+                    settled = snapshot_signatures(collect_all_files(root_dir))
+                    if settled == signatures:
+                        break
+                    signatures = settled
+                
+                all_files = collect_all_files(root_dir)
+                suspects = pending_changes(signatures, cache)
+            
+            # Failed files get another try once they have changed
+            for key in list(failed):
+                try:
+                    if stat_signature(all_files[key]) == failed[key]:
+                        continue
+                except (KeyError, OSError):
+                    pass
+                del failed[key]
+            
+            while True:
+                try:
+                    summary = watch_batch(root_dir, all_files, cache, jobs, persist, suspects, failed)
+                except (OSError, UnicodeDecodeError) as error:
+                    candidates = set(all_files if suspects is None else suspects)
+                    candidates.update(key for key, path in all_files.items()
+                                      if path == getattr(error, 'filename', None))
+                    failures = find_unreadable(all_files, candidates - set(failed))
+                    if not failures:
+                        print(f"    [!!] batch failed: {error}")
+                        break
+                    
+                    for key, failure in failures.items():
+                        print(f"    [!!] {key}: {failure}")
+                        try:
+                            failed[key] = stat_signature(all_files[key])
+                        except OSError:
+                            # Gone before it could be read: handle it as removed
+                            del all_files[key]
+                    continue
+                
+                if summary is not None:
+                    print(summary)
+                break
+    except KeyboardInterrupt:
+        print("  Stopped watching.")
+    finally:
+        if watcher is not None:
+            watcher.close()
+
+
 def main():
-    import sys
+    parser = argparse.ArgumentParser(description="Attach merkle hash headers to tracked files.")
+    parser.add_argument('root_dir', nargs='?', default='.', help="directory to process (default: .)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f"ignore and do not update {CACHE_FILE}; rehash every file")
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help="worker processes for pass 2 (default: 1, 0 = all CPUs)")
+    parser.add_argument('--why', metavar='FILE',
+                        help="explain why FILE would be re-headered, then exit without writing")
+    parser.add_argument('--check', action='store_true',
+                        help="report missing or stale headers without writing; exit 1 if any")
+    parser.add_argument('--watch', action='store_true',
+                        help="after the initial pass, keep headers current until interrupted")
+    parser.add_argument('--poll', type=float, default=WATCH_POLL_INTERVAL, metavar='SECONDS',
+                        help=f"watch mode stat-polling interval (default: {WATCH_POLL_INTERVAL})")
+    parser.add_argument('--debounce', type=float, default=WATCH_DEBOUNCE, metavar='SECONDS',
+                        help=f"watch mode quiet period before a batch runs (default: {WATCH_DEBOUNCE})")
+    args = parser.parse_args()
     
-    root_dir = sys.argv[1] if len(sys.argv) > 1 else "."
-    root_dir = os.path.abspath(root_dir)
+    root_dir = os.path.abspath(args.root_dir)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
     
     print("=" * 60)
     print("  MERKLE HEADER ATTACHMENT")
     print("=" * 60)
     print(f"  Directory: {root_dir}")
+    if jobs > 1:
+        print(f"  Jobs: {jobs}")
     print()
     
-    # First pass: collect all files and compute preliminary hashes
-    print("  Pass 1: Collecting files...")
-    all_files = collect_all_files(root_dir)
+    # Without --no-cache the cache persists; either way it collects the leaf hashes
+    cache = HashCache() if args.no_cache else HashCache.load(os.path.join(root_dir, CACHE_FILE))
     
-    # Compute hashes for dependency resolution
-    all_hashes = {}
-    for basename, filepath in all_files.items():
-        with open(filepath, 'rb') as f:
-            content = f.read()
-        all_hashes[basename] = compute_hash(content)
+    # First pass: collect all files, read new or modified ones once, index dependencies
+    print("  Pass 1: Scanning files...")
+    all_files = collect_all_files(root_dir)
+    scans, index, changed = plan_updates(all_files, cache)
+    via = index.invalidate(changed)
+    all_hashes = {key: scan['hash'] for key, scan in scans.items()}
     
-    print(f"  Found {len(all_files)} files to process")
+    print(f"  Found {len(all_files)} files, {len(changed)} changed, {len(via)} to update")
     print()
     
-    # Second pass: process each file
+    if args.why:
+        key = os.path.relpath(os.path.abspath(args.why), root_dir).replace(os.sep, '/')
+        if key not in all_files and args.why in all_files:
+            key = args.why
+        if key not in all_files:
+            print(f"  {args.why} is not a tracked file")
+            sys.exit(2)
+        print_why(key, index, via, changed)
+        return
+    
+    if args.check:
+        print("  Pass 2: Checking headers...")
+        problems = check_headers(all_files, scans, index)
+        for key, problem in problems.items():
+            print(f"    [!!] {key}: {problem}")
+        
+        # The merkle state must match a tree built from the current leaves
+        previous = load_merkle_state(os.path.join(root_dir, STATE_FILE))
+        state, _ = build_merkle_tree({key: scan['hash'] for key, scan in scans.items()}, previous)
+        state_current = state == previous
+        
+        print()
+        print("=" * 60)
+        print(f"  Check: {len(problems)} stale, {len(all_files) - len(problems)} current")
+        print(f"  Merkle state: {'current' if state_current else 'stale'} ({state['root']})")
+        print("=" * 60)
+        sys.exit(0 if not problems and state_current else 1)
+    
+    # Second pass: re-header changed files and their dependents
     print("  Pass 2: Attaching headers...")
     
-    results = {'success': 0, 'skipped': 0, 'failed': 0}
+    results = {'success': 0, 'skipped': len(all_files) - len(via), 'failed': 0}
+    file_time = 0.0
+    pass_start = time.perf_counter()
+    dirty = {key: all_files[key] for key in via}
     
-    for basename, filepath in sorted(all_files.items()):
-        success, result = process_file(filepath, all_hashes)
+    for key, success, result, elapsed in iter_process_results(dirty, all_hashes, cache, jobs):
+        file_time += elapsed
         
         if success:
-            print(f"    [OK] {basename} -> {result}")
+            print(f"    [OK] {key} -> {result} ({elapsed * 1000:.1f} ms)")
             results['success'] += 1
         else:
-            print(f"    [--] {basename}: {result}")
+            print(f"    [--] {key}: {result}")
             results['skipped'] += 1
     
+    pass_time = time.perf_counter() - pass_start
+    
+    if not args.no_cache:
+        cache.save(keep=list(all_files))
+    
     print()
     print("=" * 60)
     print(f"  Complete: {results['success']} updated, {results['skipped']} skipped")
+    if args.no_cache:
+        print("  Cache: disabled (--no-cache)")
+    else:
+        print(f"  Cache: {cache.hits} hits, {cache.misses} misses")
+    speedup = file_time / pass_time if pass_time > 0 else 1.0
+    print(f"  Time: {pass_time:.3f}s wall, {file_time:.3f}s in files ({speedup:.1f}x, {jobs} job{'s' if jobs != 1 else ''})")
     print("=" * 60)
     
-    # Third pass: rebuild merkle tree
+    # Third pass: rebuild merkle tree from the content hashes of pass 1
     print()
-    print("  Rebuilding merkle state...")
-    os.system(f'cd "{root_dir}" && python oke_merkle.py . > /dev/null 2>&1')
+    print("  Pass 3: Rebuilding merkle tree...")
+    state, rehashed = update_merkle_state(root_dir, scans)
+    print(f"  Root: {state['root']} ({rehashed} of {len(state['dirs'])} directories rehashed)")
     print("  Done.")
+    
+    if args.watch:
+        print()
+        watch(root_dir, cache, jobs, persist=not args.no_cache,
+              poll_interval=args.poll, debounce=args.debounce)
 
 
 if __name__ == "__main__":
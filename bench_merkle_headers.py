@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+==============================================================================
+MERKLE HEADER BENCHMARK
+==============================================================================
+Measures how attach_merkle_headers.py scales on synthetic trees.
+
+For each tree size a fresh tree of .md/.py/.txt files is generated in a
+temporary directory and every pass of the tool is timed:
+
+- collect:     collect_all_files
+- scan:        cold plan_updates (raw hash, header strip and reference scan
+               from one read per file, plus the DependencyIndex)
+- write:       header attachment (iter_process_results)
+- tree:        full Merkle tree build
+- tree_incr:   incremental tree rebuild after one leaf changes
+- warm_scan:   plan_updates against a warm hash cache (no-op run)
+
+After the timed passes, a cacheless rescan must agree with the warm cache
+and find every header current (the run exits 1 otherwise); some generated
+files start with blank lines, which stripping a header removes.
+
+Each size runs twice in fresh processes: once for timings and once under
+tracemalloc, which records the peak Python allocation of every pass on its
+own (mmap'd file data is not counted). Results (seconds, files/s, MB/s, peak
+allocation, overall peak RSS) are written as JSON so runs can be compared
+between commits with --compare.
+
+Usage:
+    python bench_merkle_headers.py --sizes 1000,10000 --output bench.json
+    python bench_merkle_headers.py --compare old.json --output new.json
+==============================================================================
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import subprocess
+import tempfile
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import attach_merkle_headers as amh
+
+# Default tree sizes (number of files)
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Files per generated subdirectory
+FILES_PER_DIR = 200
+
+# Filler line used to pad generated bodies to the requested size
+FILLER = "The quick brown fox jumps over the lazy dog. 0123456789\n"
+
+# Every Nth generated body starts with a blank line
+LEADING_BLANK_EVERY = 10
+
+
+def generate_tree(root_dir: str, num_files: int, file_size: int, header_fraction: float,
+                  dep_density: float, seed: int = 0) -> int:
+    """
+    Write a synthetic tree of tracked files and return its total size in bytes.
+    
+    Files are spread over subdirectories of FILES_PER_DIR, cycling through
+    docs_*.md, oke_*.py and notes_*.txt. Each file references on average
+    dep_density siblings (by names the tool's patterns recognise), and
+    header_fraction of the files start with an (outdated) merkle header.
+    One in LEADING_BLANK_EVERY bodies starts with a blank line.
+    """
+    rng = random.Random(seed)
+    total = 0
+    
+    for dir_index in range((num_files + FILES_PER_DIR - 1) // FILES_PER_DIR):
+        rel_dir = f'd{dir_index:04d}'
+        os.makedirs(os.path.join(root_dir, rel_dir), exist_ok=True)
+        count = min(FILES_PER_DIR, num_files - dir_index * FILES_PER_DIR)
+        names = [('docs_{}.md', 'oke_{}.py', 'notes_{}.txt')[i % 3].format(i) for i in range(count)]
+        
+        for name in names:
+            ext = os.path.splitext(name)[1]
+            
+            # Poisson-ish reference count around dep_density
+            refs = []
+            while rng.random() < dep_density / (1 + dep_density) and len(refs) < count:
+                target = rng.choice(names)
+                if target.endswith('.md'):
+                    refs.append(f'See {target} for details.\n')
+                elif target.endswith('.py') and ext == '.py':
+                    refs.append(f'import {target[:-3]}\n')
+            
+            body = ''.join(refs)
+            body += FILLER * max(0, (file_size - len(body)) // len(FILLER))
+            if rng.randrange(LEADING_BLANK_EVERY) == 0:
+                body = '\n' + body
+            
+            if rng.random() < header_fraction:
+                filepath = os.path.join(root_dir, rel_dir, name)
+                if ext == '.md':
+                    header = amh.create_markdown_header(filepath, '0' * 16, {})
+                elif ext == '.py':
+                    header = amh.create_python_header(filepath, '0' * 16, {})
+                else:
+                    header = amh.create_text_header(filepath, '0' * 16)
+                body = header + body
+            
+            data = body.encode('utf-8')
+            with open(os.path.join(root_dir, rel_dir, name), 'wb') as f:
+                f.write(data)
+            total += len(data)
+    
+    return total
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process in KiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def timed(passes: Dict[str, dict], name: str, files: int, nbytes: int, func):
+    """
+    Run func and record it under passes[name], returning its result.
+    
+    With tracemalloc running only the pass's peak allocation is recorded
+    (timings would include the tracing overhead); otherwise its timing and
+    throughput.
+    """
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        result = func()
+        passes[name] = {'peak_alloc_kb': max(0, tracemalloc.get_traced_memory()[1] - base) // 1024}
+        return result
+    
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    passes[name] = {
+        'seconds': round(seconds, 6),
+        'files_per_s': round(files / seconds, 1) if seconds > 0 else None,
+        'mb_per_s': round(nbytes / seconds / 1e6, 2) if seconds > 0 else None,
+    }
+    return result
+
+
+def bench_size(num_files: int, file_size: int, header_fraction: float, dep_density: float,
+               jobs: int, seed: int, trace_memory: bool = False) -> dict:
+    """Generate one tree and time (or trace the memory of) every pass over it."""
+    with tempfile.TemporaryDirectory(prefix='merkle_bench_') as root_dir:
+        gen_start = time.perf_counter()
+        nbytes = generate_tree(root_dir, num_files, file_size, header_fraction, dep_density, seed)
+        gen_seconds = time.perf_counter() - gen_start
+        
+        if trace_memory:
+            tracemalloc.start()
+        passes: Dict[str, dict] = {}
+        
+        all_files = timed(passes, 'collect', num_files, 0, lambda: amh.collect_all_files(root_dir))
+        
+        # Pass 1 exactly as main() runs it, against an empty cache
+        cache = amh.HashCache()
+        scans, index, changed = timed(passes, 'scan', num_files, nbytes,
+                                      lambda: amh.plan_updates(all_files, cache))
+        edges = sum(len(deps) for deps in index.forward.values())
+        
+        via = index.invalidate(changed)
+        dirty = {key: all_files[key] for key in via}
+        all_hashes = {key: scan['hash'] for key, scan in scans.items()}
+        timed(passes, 'write', len(dirty), nbytes, lambda: sum(
+            1 for _ in amh.iter_process_results(dirty, all_hashes, cache, jobs)))
+        
+        leaves = {key: scan['hash'] for key, scan in scans.items()}
+        state, _ = timed(passes, 'tree', num_files, 0, lambda: amh.build_merkle_tree(leaves))
+        
+        changed_leaves = dict(leaves)
+        changed_leaves[min(changed_leaves)] = '0' * 16
+        _, rehashed = timed(passes, 'tree_incr', 0, 0, lambda: amh.build_merkle_tree(changed_leaves, state))
+        
+        warm_scans, _, _ = timed(passes, 'warm_scan', num_files, 0, lambda: amh.plan_updates(all_files, cache))
+        
+        if trace_memory:
+            tracemalloc.stop()
+            mismatches, stale = [], {}
+        else:
+            # Regression check: a cacheless rescan must agree with the warm cache
+            fresh_scans, fresh_index, _ = amh.plan_updates(all_files, amh.HashCache())
+            mismatches = sorted(key for key in all_files if fresh_scans[key]['hash'] != warm_scans[key]['hash'])
+            stale = amh.check_headers(all_files, fresh_scans, fresh_index)
+    
+    return {
+        'files': num_files,
+        'bytes': nbytes,
+        'dependency_edges': edges,
+        'generate_seconds': round(gen_seconds, 3),
+        'tree_incr_dirs_rehashed': rehashed,
+        'cache_mismatches': mismatches,
+        'stale_after_write': stale,
+        'passes': passes,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def run_size(num_files: int, args: argparse.Namespace) -> dict:
+    """Benchmark one size: timings and memory each in a fresh process."""
+    params = (num_files, args.file_size, args.header_fraction, args.dep_density, args.jobs, args.seed)
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        result = pool.submit(bench_size, *params).result()
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        traced = pool.submit(bench_size, *params, trace_memory=True).result()
+    
+    for name, stats in result['passes'].items():
+        stats.update(traced['passes'][name])
+    return result
+
+
+def git_revision() -> Optional[str]:
+    """Short hash of the current commit, if this is a git checkout."""
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def print_comparison(old: dict, new: dict):
+    """Print per-pass time ratios (new / old) for sizes present in both runs."""
+    old_by_size = {r['files']: r for r in old.get('results', [])}
+    print()
+    print(f"  Compared with {old.get('meta', {}).get('revision') or 'previous run'} (new/old time):")
+    for result in new['results']:
+        base = old_by_size.get(result['files'])
+        if base is None:
+            continue
+        ratios = []
+        for name, stats in result['passes'].items():
+            before = base['passes'].get(name, {}).get('seconds')
+            if before:
+                ratios.append(f"{name} {stats['seconds'] / before:.2f}x")
+        print(f"    {result['files']:>7} files: {', '.join(ratios)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark attach_merkle_headers.py on synthetic trees.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated file counts (default: 1000,10000,100000)")
+    parser.add_argument('--file-size', type=int, default=2048, metavar='BYTES',
+                        help="approximate body size per file (default: 2048)")
+    parser.add_argument('--header-fraction', type=float, default=0.5,
+                        help="fraction of files generated with an existing header (default: 0.5)")
+    parser.add_argument('--dep-density', type=float, default=1.0,
+                        help="average references per file (default: 1.0)")
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help="worker processes for the write pass (default: 1)")
+    parser.add_argument('--seed', type=int, default=0, help="tree generator seed (default: 0)")
+    parser.add_argument('--output', '-o', default='merkle_bench.json', help="JSON results file")
+    parser.add_argument('--compare', metavar='JSON', help="previous results file to compare against")
+    args = parser.parse_args()
+    
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    
+    print("=" * 60)
+    print("  MERKLE HEADER BENCHMARK")
+    print("=" * 60)
+    
+    results: List[dict] = []
+    for num_files in sizes:
+        print(f"  {num_files} files...", flush=True)
+        result = run_size(num_files, args)
+        results.append(result)
+        
+        for name, stats in result['passes'].items():
+            rate = f"{stats['files_per_s']:>12,.0f} files/s" if stats['files_per_s'] else ' ' * 20
+            mb = f"{stats['mb_per_s']:>8.1f} MB/s" if stats['mb_per_s'] else ' ' * 13
+            print(f"    {name:<10} {stats['seconds']:>9.4f}s {rate} {mb} {stats['peak_alloc_kb'] / 1024:>8.1f} MiB peak")
+        print(f"    process peak RSS (whole run): {result['peak_rss_kb'] / 1024:.1f} MiB")
+        
+        for key in result['cache_mismatches']:
+            print(f"    [!!] {key}: cached hash differs from a cacheless scan")
+        for key, problem in result['stale_after_write'].items():
+            print(f"    [!!] {key}: {problem} after the write pass")
+    
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': {
+                'file_size': args.file_size,
+                'header_fraction': args.header_fraction,
+                'dep_density': args.dep_density,
+                'jobs': args.jobs,
+                'seed': args.seed,
+            },
+        },
+        'results': results,
+    }
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print()
+    print(f"  Results written to {args.output}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(json.load(f), report)
+    print("=" * 60)
+    
+    if any(r['cache_mismatches'] or r['stale_after_write'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
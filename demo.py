@@ -2,21 +2,32 @@
 """
 EMERALD_PYGAME Demo - Run from project root
 Usage: python demo.py
+       python demo.py --startup-profile   # cold-start import times vs budget
+
+Game modules are imported inside each demo, so starting the script (or a
+worker that only needs one subsystem) does not pay for the others.
 """
 
+import os
 import sys
+import subprocess
 from pathlib import Path
 
+SRC_DIR = Path(__file__).parent / "src"
+
 # Add src to path so imports work
-sys.path.insert(0, str(Path(__file__).parent / "src"))
+sys.path.insert(0, str(SRC_DIR))
 
-from data.loader import validate_data, get_species, get_move
-from models import create_pokemon, create_player, create_gym_leader, get_move_obj_by_name
-from engines import BattleEngine, BattleAction, ActionType
+# Modules a single-battle worker needs, and the cold-start budget for them
+STARTUP_MODULES = ["data.loader", "models", "engines"]
+STARTUP_BUDGET_MS = 200.0
 
 
 def demo_data():
     """Test data loading."""
+    from data.loader import validate_data, get_species
+    from models import get_move_obj_by_name
+    
     print("=" * 60)
     print("DATA VALIDATION")
     print("=" * 60)
@@ -36,6 +47,8 @@ def demo_data():
 
 def demo_pokemon():
     """Test Pokemon creation."""
+    from models import create_pokemon
+    
     print("\n" + "=" * 60)
     print("POKEMON CREATION")
     print("=" * 60)
@@ -54,6 +67,9 @@ def demo_pokemon():
 
 def demo_battle():
     """Run a sample battle."""
+    from models import create_pokemon, create_player, create_gym_leader
+    from engines import BattleEngine, BattleAction, ActionType
+    
     print("\n" + "=" * 60)
     print("BATTLE DEMO")
     print("=" * 60)
@@ -131,6 +147,8 @@ def demo_battle():
 
 def demo_type_effectiveness():
     """Show type effectiveness in action."""
+    from models import get_move_obj_by_name
+    
     print("\n" + "=" * 60)
     print("TYPE EFFECTIVENESS")
     print("=" * 60)
@@ -154,6 +172,8 @@ def demo_ai():
     print("AI DECISION-MAKING")
     print("=" * 60)
     
+    from models import create_pokemon, create_player, create_gym_leader
+    from engines import BattleEngine
     from engines.ai import TrainerAI
     from engines.ai_scoring import score_all_moves
     from engines.battle_pokemon import wrap_for_battle
@@ -395,6 +415,49 @@ def demo_pygame():
     print("   python src/views/game.py")
 
 
+def startup_profile() -> int:
+    """
+    Report cold-start import cost of STARTUP_MODULES using -X importtime.
+    
+    Runs a fresh interpreter so nothing is already imported, prints the
+    slowest modules and returns 1 if the total exceeds STARTUP_BUDGET_MS.
+    """
+    print("=" * 60)
+    print("STARTUP PROFILE")
+    print("=" * 60)
+    
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(SRC_DIR), os.environ.get("PYTHONPATH")])))
+    code = "; ".join(f"import {name}" for name in STARTUP_MODULES)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, env=env)
+    
+    # Lines look like: "import time:  self [us] | cumulative | imported package"
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    
+    if proc.returncode != 0:
+        print(f"  ✗ Import failed:\n{proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else ''}")
+        return 1
+    
+    # Sum the top-level entries (no nesting indent) of STARTUP_MODULES and their
+    # parent packages; the rest is interpreter bootstrap (encodings, site, ...)
+    targets = {name.rsplit(".", depth)[0] for name in STARTUP_MODULES for depth in range(name.count(".") + 1)}
+    total_ms = sum(cumulative for cumulative, _, name in rows
+                   if not name.startswith("  ") and name.strip() in targets) / 1000
+    
+    print("\n  Slowest imports (cumulative ms):")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:15]:
+        print(f"    {cumulative / 1000:8.1f}  (self {self_us / 1000:6.1f})  {name.strip()}")
+    
+    status = "✓" if total_ms <= STARTUP_BUDGET_MS else "✗"
+    print(f"\n  {status} Cold start with {', '.join(STARTUP_MODULES)}: {total_ms:.1f} ms (budget {STARTUP_BUDGET_MS:.0f} ms)")
+    return 0 if total_ms <= STARTUP_BUDGET_MS else 1
+
+
 def main():
     print("\n" + "=" * 60)
     print("   EMERALD_PYGAME - Demo")
@@ -416,4 +479,6 @@ def main():
 
 
 if __name__ == "__main__":
+    if "--startup-profile" in sys.argv[1:]:
+        sys.exit(startup_profile())
     main()